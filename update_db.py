@@ -0,0 +1,103 @@
+import os
+import sqlite3
+import sys
+
+# ✅ Run after each ingest: python update_db.py [path/to/database.db]
+# The viewer (webpokus.py) opens the database read-only and never writes to it.
+db_path = os.path.join(os.path.dirname(__file__), "database.db")
+
+# ✅ Indexes for the hot WHERE / GROUP BY / JOIN columns
+INDEXES = [
+    # Covering index: the player list and the per-player shot query never touch the table
+    "CREATE INDEX IF NOT EXISTS idx_shots_player_coords ON Shots(player_name, x_coord, y_coord, shot_result);",
+    "CREATE INDEX IF NOT EXISTS idx_teams_name_tm ON Teams(name, tm);",
+    # Covering indexes for the referee join: game_id lookup, role filter and names/fouls all from the index
+    "CREATE INDEX IF NOT EXISTS idx_teams_game_fouls ON Teams(game_id, fouls_total);",
+    "CREATE INDEX IF NOT EXISTS idx_officials_game_role ON Officials(game_id, role, first_name, last_name);",
+]
+
+# ✅ A missing source table is reported and skipped; anything else (e.g. a read-only file) is fatal
+def _missing_table(error):
+    return str(error).startswith("no such table")
+
+# ✅ Create missing indexes and refresh planner statistics; returns the skipped statements
+def create_indexes(conn):
+    skipped = []
+    for statement in INDEXES:
+        try:
+            conn.execute(statement)
+        except sqlite3.OperationalError as error:
+            if not _missing_table(error):
+                raise
+            skipped.append(f"{statement} ({error})")
+    conn.execute("ANALYZE;")
+    conn.commit()
+    return skipped
+
+# ✅ Per-team season averages, materialized into TeamsSummary
+TEAM_SUMMARY_QUERY = """
+    SELECT
+        name AS Team,
+        CASE WHEN tm = 1 THEN 'Home' ELSE 'Away' END AS Location,
+        COUNT(game_id) AS Games_Played,
+        AVG(p1_score + p2_score + p3_score + p4_score) AS Avg_Points,
+        AVG(fouls_total) AS Avg_Fouls,
+        AVG(free_throws_made) AS Avg_Free_Throws,
+        AVG(field_goals_made) AS Avg_Field_Goals,
+        AVG(assists) AS Avg_Assists,
+        AVG(rebounds_total) AS Avg_Rebounds,
+        AVG(steals) AS Avg_Steals,
+        AVG(turnovers) AS Avg_Turnovers,
+        AVG(blocks) AS Avg_Blocks
+    FROM Teams
+    GROUP BY name, tm
+"""
+
+# ✅ Per-referee foul averages, materialized into RefereeSummary
+REFEREE_SUMMARY_QUERY = """
+    SELECT o.first_name || ' ' || o.last_name AS Referee,
+           COUNT(t.game_id) AS Games_Officiated,
+           AVG(t.fouls_total) AS Avg_Fouls_per_Game
+    FROM Officials o
+    JOIN Teams t ON o.game_id = t.game_id
+    WHERE o.role <> 'commissioner'
+    GROUP BY Referee
+"""
+
+# ✅ Summary tables and the aggregate that fills each one
+SUMMARY_TABLES = {
+    "TeamsSummary": TEAM_SUMMARY_QUERY,
+    "RefereeSummary": REFEREE_SUMMARY_QUERY,
+}
+
+# ✅ Rebuild the summary tables from their source tables; returns the skipped tables
+def refresh_summaries(conn):
+    skipped = []
+    for table, query in SUMMARY_TABLES.items():
+        try:
+            # Recreated rather than refilled, so a changed query never leaves stale columns behind
+            with conn:
+                conn.execute("BEGIN;")
+                conn.execute(f"DROP TABLE IF EXISTS {table};")
+                conn.execute(f"CREATE TABLE {table} AS {query};")
+        except sqlite3.OperationalError as error:
+            if not _missing_table(error):
+                raise
+            # Don't leave the old summary behind; the viewer falls back to the inline aggregate
+            with conn:
+                conn.execute(f"DROP TABLE IF EXISTS {table};")
+            skipped.append(f"{table} ({error})")
+    return skipped
+
+def main(path=db_path):
+    conn = sqlite3.connect(path)
+    try:
+        skipped = create_indexes(conn) + refresh_summaries(conn)
+    finally:
+        conn.close()
+    for item in skipped:
+        print(f"skipped: {item}", file=sys.stderr)
+    return 1 if skipped else 0
+
+if __name__ == "__main__":
+    sys.exit(main(*sys.argv[1:2]))
@@ -1,188 +1,193 @@
 import os
 import sqlite3
+from pathlib import Path
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import matplotlib.pyplot as plt
-import matplotlib.image as mpimg
-import seaborn as sns
+import numpy as np
+from update_db import TEAM_SUMMARY_QUERY, REFEREE_SUMMARY_QUERY  # Inline fallback when a summary table is missing
 
 # ✅ Define SQLite database path (works locally & online)
 db_path = os.path.join(os.path.dirname(__file__), "database.db")
 
+# ✅ Court image, served by Streamlit from static/ so the browser can cache it
+court_path = os.path.join(os.path.dirname(__file__), "static", "fiba_courtonly.jpg")
+court_url = "app/static/fiba_courtonly.jpg"
+court_available = os.path.exists(court_path)  # Bundled with the app, so checked once at import
+MAX_SHOT_MARKERS = 500  # Above this many shots the chart shows the density heatmap only
+
+# ✅ Shared read-only SQLite connection, reopened when the database file changes
+# (a replaced database.db would otherwise keep being read through the old file handle)
+@st.cache_resource(max_entries=1)
+def get_conn(mtime):
+    conn = sqlite3.connect(Path(db_path).resolve().as_uri() + "?mode=ro", uri=True, check_same_thread=False)
+    conn.execute("PRAGMA mmap_size = 268435456;")  # Serve pages from the mapped file
+    conn.execute("PRAGMA cache_size = -64000;")  # 64 MiB page cache, well above the database size
+    conn.execute("PRAGMA temp_store = MEMORY;")
+    return conn
+
+# ✅ Database modification time, passed to the cached fetches so a re-ingest invalidates them
+def db_mtime():
+    return os.path.getmtime(db_path)
+
+# ✅ Names of all tables in the database (re-probed when the file changes)
+@st.cache_data(ttl=3600, show_spinner=False)
+def _tables(mtime):
+    rows = get_conn(mtime).execute("SELECT name FROM sqlite_master WHERE type='table';").fetchall()
+    return frozenset(row[0] for row in rows)
+
+# ✅ Run a query on the shared connection and wrap the rows in a DataFrame
+def _q(sql, mtime, params=()):
+    cursor = get_conn(mtime).execute(sql, params)
+    columns = [col[0] for col in cursor.description]
+    return pd.DataFrame.from_records(cursor.fetchall(), columns=columns)
+
 # ✅ Function to check if a table exists
-def table_exists(table_name):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table_name}';")
-    exists = cursor.fetchone() is not None
-    conn.close()
-    return exists
+def table_exists(table_name, mtime):
+    return table_name in _tables(mtime)
 
-# ✅ Fetch team data (averages per game)
-def fetch_team_data():
-    if not table_exists("Teams"):
-        st.error("⚠️ Error: 'Teams' table not found in the database.")
-        return pd.DataFrame()  # Return empty DataFrame
+# ✅ Tables each page reads from, checked in main() for the selected page only
+PAGE_TABLES = {
+    "Team Season Boxscore": ["Teams"],
+    "Head-to-Head Comparison": ["Teams"],
+    "Referee Stats": ["Officials", "Teams"],
+    "Shot Chart": ["Shots"],
+}
 
-    conn = sqlite3.connect(db_path)
-    query = """
-    SELECT 
-        name AS Team,
-        CASE WHEN tm = 1 THEN 'Home' ELSE 'Away' END AS Location,
-        COUNT(game_id) AS Games_Played,
-        AVG(p1_score + p2_score + p3_score + p4_score) AS Avg_Points,
-        AVG(fouls_total) AS Avg_Fouls,
-        AVG(free_throws_made) AS Avg_Free_Throws,
-        AVG(field_goals_made) AS Avg_Field_Goals,
-        AVG(assists) AS Avg_Assists,
-        AVG(rebounds_total) AS Avg_Rebounds,
-        AVG(steals) AS Avg_Steals,
-        AVG(turnovers) AS Avg_Turnovers,
-        AVG(blocks) AS Avg_Blocks
-    FROM Teams
-    GROUP BY name, tm
-    ORDER BY Avg_Points DESC;
-    """
-    df = pd.read_sql(query, conn)
-    conn.close()
+# ✅ Fetch team data (averages per game)
+@st.cache_data(ttl=3600, show_spinner=False)
+def fetch_team_data(mtime):
+    # Read the summary built by update_db.py; aggregate on the fly if it has not been run
+    source = "TeamsSummary" if table_exists("TeamsSummary", mtime) else f"({TEAM_SUMMARY_QUERY})"
+    query = f"SELECT * FROM {source} ORDER BY Avg_Points DESC;"
+    df = _q(query, mtime).convert_dtypes(dtype_backend="pyarrow")
+
+    # Per-game averages only need single precision
+    avg_cols = [col for col in df.columns if col.startswith("Avg_")]
+    df[avg_cols] = df[avg_cols].astype("float32[pyarrow]")
     return df
 
-# ✅ Fetch Assists vs Turnovers
-def fetch_assists_vs_turnovers():
-    if not table_exists("Teams"):
-        return pd.DataFrame()
-
-    conn = sqlite3.connect(db_path)
-    query = """
-    SELECT name AS Team, AVG(assists) AS Avg_Assists, AVG(turnovers) AS Avg_Turnovers
-    FROM Teams
-    GROUP BY name
-    ORDER BY Avg_Assists DESC;
-    """
-    df = pd.read_sql(query, conn)
-    conn.close()
+# ✅ Fetch referee statistics
+@st.cache_data(ttl=3600, show_spinner=False)
+def fetch_referee_data(mtime):
+    # Read the summary built by update_db.py; aggregate on the fly if it has not been run
+    source = "RefereeSummary" if table_exists("RefereeSummary", mtime) else f"({REFEREE_SUMMARY_QUERY})"
+    query = f"SELECT * FROM {source} ORDER BY Avg_Fouls_per_Game DESC;"
+    df = _q(query, mtime).convert_dtypes(dtype_backend="pyarrow").astype({"Avg_Fouls_per_Game": "float32[pyarrow]"})
     return df
 
-# ✅ Fetch referee statistics
-def fetch_referee_data():
-    if not table_exists("Officials"):
-        st.error("⚠️ Error: 'Officials' table not found in the database.")
-        return pd.DataFrame()
+# ✅ Fetch Player Names for Dropdown
+@st.cache_data(ttl=3600, show_spinner=False)
+def fetch_players(mtime):
+    conn = get_conn(mtime)
+    query = "SELECT DISTINCT player_name FROM Shots ORDER BY player_name;"
+    players = [row[0] for row in conn.execute(query).fetchall()]
+    return players
 
-    conn = sqlite3.connect(db_path)
+# ✅ Fetch shots for a single player as (x, y, made) arrays (coordinates scaled in SQL)
+@st.cache_data(ttl=3600, show_spinner=False)
+def fetch_shots(player_name, mtime):
     query = """
-    SELECT o.first_name || ' ' || o.last_name AS Referee,
-           COUNT(t.game_id) AS Games_Officiated,
-           AVG(t.fouls_total) AS Avg_Fouls_per_Game
-    FROM Officials o
-    JOIN Teams t ON o.game_id = t.game_id
-    WHERE o.role NOT LIKE 'commissioner'
-    GROUP BY Referee
-    ORDER BY Avg_Fouls_per_Game DESC;
+    SELECT x_coord * 2.8 AS x,
+           261 - y_coord * 2.61 AS y,
+           COALESCE(shot_result, 0) = 1 AS made
+    FROM Shots 
+    WHERE player_name = ?;
     """
-    df = pd.read_sql(query, conn)
-    conn.close()
-    return df
+    rows = get_conn(mtime).execute(query, (player_name,)).fetchall()
+    x, y, made = np.asarray(rows, dtype=np.float32).reshape(-1, 3).T.copy()  # Contiguous columns
+    return x, y, made == 1
 
-# ✅ Fetch Player Names for Dropdown
-def fetch_players():
-    if not table_exists("Shots"):
-        return []
+# ✅ Court background figure (layout only; built once per process)
+@st.cache_resource
+def court_figure():
+    import plotly.graph_objects as go
 
-    conn = sqlite3.connect(db_path)
-    query = "SELECT DISTINCT player_name FROM Shots ORDER BY player_name;"
-    players = pd.read_sql(query, conn)["player_name"].tolist()
-    conn.close()
-    return players
+    fig = go.Figure()
+    fig.add_layout_image(source=court_url, xref="x", yref="y", x=0, y=261,
+                         sizex=280, sizey=261, sizing="stretch", layer="below")
+
+    # ✅ Remove all axis elements (clean chart)
+    fig.update_xaxes(range=[0, 280], visible=False)
+    fig.update_yaxes(range=[0, 261], visible=False)
+    fig.update_layout(height=600, margin=dict(l=0, r=0, t=0, b=0))
+    return fig
 
 # ✅ Generate Shot Chart
 def generate_shot_chart(player_name):
     """Generate a shot chart with heatmap restricted within the court boundaries."""
+    import plotly.graph_objects as go
+    from scipy.ndimage import gaussian_filter
 
-    if not os.path.exists("fiba_courtonly.jpg"):
+    if not court_available:
         st.error("⚠️ Court image file 'fiba_courtonly.jpg' is missing!")
         return
 
-    conn = sqlite3.connect(db_path)
-    query = """
-    SELECT x_coord, y_coord, shot_result
-    FROM Shots 
-    WHERE player_name = ?;
-    """
-    df_shots = pd.read_sql_query(query, conn, params=(player_name,))
-    conn.close()
+    # ✅ Court-image coordinates (already scaled by the query) and made mask
+    x, y, made = fetch_shots(player_name, db_mtime())
 
-    if df_shots.empty:
+    if x.size == 0:
         st.warning(f"❌ No shot data found for {player_name}.")
         return
 
-    # ✅ Convert shot_result to match 'made' or 'missed' conditions
-    df_shots["shot_result"] = df_shots["shot_result"].astype(str)
-    df_shots["shot_result"] = df_shots["shot_result"].replace({"1": "made", "0": "missed"})
-
-    # ✅ Scale coordinates to match court image dimensions
-    df_shots["x_coord"] = df_shots["x_coord"] * 2.8  
-    df_shots["y_coord"] = 261 - (df_shots["y_coord"] * 2.61)
-
-    # ✅ Load court image
-    court_img = mpimg.imread("fiba_courtonly.jpg")
+    # ✅ Start from a copy of the cached court figure (shared template stays untouched)
+    fig = go.Figure(court_figure())
 
-    # ✅ Create figure
-    fig, ax = plt.subplots(figsize=(8, 6))
-    ax.imshow(court_img, extent=[0, 280, 0, 261], aspect="auto")
+    # ✅ Heatmap (binned density + Gaussian blur, restricted to court area)
+    density, _, _ = np.histogram2d(x, y, bins=(140, 130), range=[[0, 280], [0, 261]])
+    density = gaussian_filter(density, sigma=3)
+    density[density <= density.max() * 0.05] = np.nan  # Leave empty court uncoloured
+    fig.add_trace(go.Heatmap(z=density.T, x0=1, dx=2, y0=261 / 260, dy=261 / 130,
+                             colorscale="RdBu_r", opacity=0.5, showscale=False, hoverinfo="skip"))
 
-    # ✅ Heatmap (restrict to court area)
-    sns.kdeplot(
-        data=df_shots, 
-        x="x_coord", y="y_coord", 
-        cmap="coolwarm", fill=True, alpha=0.5, ax=ax, 
-        bw_adjust=0.5, clip=[[0, 280], [0, 261]]  # 🔥 Restrict heatmap within the court
-    )
+    # ✅ Heavy shooters: the binned heatmap alone keeps the chart size bounded
+    if x.size > MAX_SHOT_MARKERS:
+        st.caption(f"{x.size} shots ({int(made.sum())} made) – showing shot density only.")
+    else:
+        # ✅ Plot individual shots (WebGL, drawn client-side)
+        colors = np.where(made, "lime", "red")
 
-    # ✅ Plot individual shots
-    made_shots = df_shots[df_shots["shot_result"] == "made"]
-    missed_shots = df_shots[df_shots["shot_result"] == "missed"]
+        fig.add_trace(go.Scattergl(x=x, y=y, mode="markers", showlegend=False,
+                                   marker=dict(color=colors, size=8, line=dict(color="black", width=1))))
 
-    ax.scatter(made_shots["x_coord"], made_shots["y_coord"], 
-               c="lime", edgecolors="black", s=35, alpha=1, zorder=3, label="Made Shots")
-
-    ax.scatter(missed_shots["x_coord"], missed_shots["y_coord"], 
-               c="red", edgecolors="black", s=35, alpha=1, zorder=3, label="Missed Shots")
-
-    # ✅ Remove all axis elements (clean chart)
-    ax.set_xticks([])
-    ax.set_yticks([])
-    ax.set_xticklabels([])
-    ax.set_yticklabels([])
-    ax.axis("off")  # Hide axis
+        # Legend-only entries (no data) standing in for the made/missed colours
+        for name, color in [("Made Shots", "lime"), ("Missed Shots", "red")]:
+            fig.add_trace(go.Scattergl(x=[None], y=[None], mode="markers", name=name,
+                                       marker=dict(color=color, size=8, line=dict(color="black", width=1))))
 
     # ✅ Display chart in Streamlit
-    st.pyplot(fig)
+    st.plotly_chart(fig)
 
 # ✅ Main Function
 def main():
     st.title("🏀 Basketball Stats Viewer")
 
     # Sidebar navigation
-    page = st.sidebar.selectbox("📌 Choose a page", ["Team Season Boxscore", "Head-to-Head Comparison", "Referee Stats", "Shot Chart"])
+    page = st.sidebar.selectbox("📌 Choose a page", list(PAGE_TABLES))
+
+    missing = [table for table in PAGE_TABLES[page] if not table_exists(table, db_mtime())]
+    if missing:
+        st.error(f"⚠️ Error: missing table(s) in the database: {', '.join(missing)}")
+        return
 
     if page == "Team Season Boxscore":
-        df = fetch_team_data()
+        df = fetch_team_data(db_mtime())
 
         if df.empty:
             st.warning("No team data available.")
         else:
             st.subheader("📊 Season Team Statistics (Averages Per Game)")
-            numeric_cols = df.select_dtypes(include=['number']).columns
-            st.dataframe(df.style.format({col: "{:.1f}" for col in numeric_cols}))
+            st.dataframe(df, column_config={
+                c: st.column_config.NumberColumn(format="%.1f") for c in df.columns if c.startswith("Avg_")
+            })
 
     elif page == "Head-to-Head Comparison":
-        df = fetch_team_data()  
+        df = fetch_team_data(db_mtime())  
         if df.empty:
             st.warning("No team data available.")
             return
 
+        import plotly.express as px
+
         team_options = df["Team"].unique()
 
         # Select two teams to compare
@@ -194,38 +199,34 @@ def main():
             st.subheader(f"📊 Season Stats Comparison: {team1} vs {team2}")
 
             numeric_cols = df.columns[3:]  # Exclude 'Team', 'Location', 'Games_Played'
-            team1_stats = df[df["Team"] == team1][numeric_cols]
-            team2_stats = df[df["Team"] == team2][numeric_cols]
 
-            if team1_stats.empty or team2_stats.empty:
+            # Long format: one row per (Team, Stat), first row per team as sorted by Avg_Points
+            comparison = (df.loc[df["Team"].isin([team1, team2])]
+                            .drop_duplicates("Team")
+                            .melt(id_vars=["Team"], value_vars=list(numeric_cols),
+                                  var_name="Stat", value_name="Value"))
+
+            if comparison["Team"].nunique() < 2:
                 st.error("⚠️ Error: One or both teams have no recorded stats.")
             else:
-                # Transpose and keep correct stat names
-                team1_stats = team1_stats.T.rename(columns={team1_stats.index[0]: "Value"})
-                team2_stats = team2_stats.T.rename(columns={team2_stats.index[0]: "Value"})
-
-                # Ensure both teams have the same stats for comparison
-                team1_stats, team2_stats = team1_stats.align(team2_stats, join='outer', axis=0, fill_value=0)
-                team1_stats["Stat"] = team1_stats.index
-                team2_stats["Stat"] = team2_stats.index
-
-                # 📊 Separate bar charts for each team
-                st.subheader(f"📉 {team1} Stats Per Game")
-                fig1 = px.bar(team1_stats, x="Stat", y="Value", title=f"{team1} Stats Per Game", color="Stat")
-                st.plotly_chart(fig1)
-
-                st.subheader(f"📉 {team2} Stats Per Game")
-                fig2 = px.bar(team2_stats, x="Stat", y="Value", title=f"{team2} Stats Per Game", color="Stat")
-                st.plotly_chart(fig2)
+                # 📊 Grouped bar chart, both teams side by side per stat
+                st.subheader(f"📉 {team1} vs {team2} Stats Per Game")
+                fig = px.bar(comparison, x="Stat", y="Value", color="Team", barmode="group",
+                             title=f"{team1} vs {team2} Stats Per Game")
+                st.plotly_chart(fig)
 
     elif page == "Referee Stats":
-        df_referee = fetch_referee_data()
+        df_referee = fetch_referee_data(db_mtime())
 
         if df_referee.empty:
             st.warning("No referee data available.")
         else:
+            import plotly.express as px
+
             st.subheader("🦺 Referee Statistics")
-            st.dataframe(df_referee.style.format({"Avg_Fouls_per_Game": "{:.1f}"}))
+            st.dataframe(df_referee, column_config={
+                "Avg_Fouls_per_Game": st.column_config.NumberColumn(format="%.1f")
+            })
 
             # 📊 Interactive bar chart for referees
             st.subheader("📉 Referee Stats: Average Fouls Called Per Game")
@@ -237,7 +238,7 @@ def main():
 
     elif page == "Shot Chart":
         st.subheader("🎯 Player Shot Chart")
-        players = fetch_players()
+        players = fetch_players(db_mtime())
         if not players:
             st.warning("No player data available.")
         else: